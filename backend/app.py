@@ -11,27 +11,37 @@ GET  /matches                      - List current user's matches (protected)
 POST /matches/accept              - Create a match (pending) (protected)
 PATCH /matches/{match_id}/status  - Update match status (protected)
 POST /chat/send                   - Send a message (protected, requires accepted match)
-GET  /chat/{id}                   - Get conversation history (protected)
+GET  /chat/conversations           - List conversation partners (protected)
+GET  /chat/{id}                   - Get conversation history, paginated (protected)
 """
 
 import os
 from typing import List
 
+import orjson
 from fastapi import Depends, FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth import create_access_token, get_current_user, hash_password, verify_password
-from database import Base, engine, get_db
-from matching import find_matches, get_user_matches, store_match, update_match_status
+from database import Base, SessionLocal, engine, get_db
+from cache import (
+    RateLimitExceeded,
+    bump_candidate_pool_version,
+    cache_recommendations,
+    lookup_recommendations,
+)
+from candidate_index import candidate_index
+from config import RECOMMEND_BACKEND
+from message_batcher import message_batcher
+from matching import derived_match_fields, find_matches, get_user_matches, store_match, update_match_status
 from models import User
 from chat import router as chat_router
+from responses import json_response
 from schemas import MatchListResponse, MatchResponse, MatchWithUserResponse, UserCreate, UserLogin, UserResponse
 
-# Only auto-create tables in development mode
-if os.getenv("ENV") == "development":
-    Base.metadata.create_all(bind=engine)
-
 app = FastAPI(
     title="Smart Travel Companion Finder API",
     description="Compatibility-based travel companion recommendation system",
@@ -41,6 +51,37 @@ app = FastAPI(
 app.include_router(chat_router)
 
 
+@app.on_event("startup")
+async def create_dev_tables():
+    # Only auto-create tables in development mode
+    if os.getenv("ENV") == "development":
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+
+@app.on_event("startup")
+async def warm_candidate_index():
+    """Build the recommendation candidate index before serving traffic."""
+    if RECOMMEND_BACKEND != "index":
+        return
+    async with SessionLocal() as db:
+        snapshot = await candidate_index.rebuild(db)
+    # Triggers JIT compilation (when numba is installed) ahead of the
+    # first /recommend request.
+    snapshot.score({}, snapshot.prefilter({}))
+
+
+@app.on_event("startup")
+async def start_message_batcher():
+    message_batcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_message_batcher():
+    """Flush queued chat messages before the worker exits."""
+    await message_batcher.stop()
+
+
 # ----------------------------
 # Response Models
 # ----------------------------
@@ -70,7 +111,7 @@ class UpdateMatchStatusRequest(BaseModel):
 # ----------------------------
 
 @app.get("/")
-def health_check():
+async def health_check():
     return {"status": "Backend running successfully"}
 
 
@@ -79,22 +120,26 @@ def health_check():
 # ----------------------------
 
 @app.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Create a new user account."""
 
     # Check duplicate email
-    if db.query(User).filter(User.email == user.email).first():
+    if await db.scalar(select(User.user_id).where(User.email == user.email)):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Check duplicate user_id
-    if db.query(User).filter(User.user_id == user.user_id).first():
+    if await db.get(User, user.user_id):
         raise HTTPException(status_code=400, detail="User ID already taken")
 
+    # Argon2 is deliberately CPU-heavy; hash in the threadpool (argon2-cffi
+    # releases the GIL) so the event loop keeps serving other requests.
+    hashed_password = await run_in_threadpool(hash_password, user.password)
+
     db_user = User(
         user_id=user.user_id,
         name=user.name,
         email=user.email,
-        hashed_password=hash_password(user.password),  # 🔥 THIS LINE IS IMPORTANT
+        hashed_password=hashed_password,
         destination=user.destination,
         start_date=user.start_date,
         end_date=user.end_date,
@@ -102,11 +147,14 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         interests=user.interests,
         travel_style=user.travel_style,
         discoverable=user.discoverable,
+        **derived_match_fields(user),
     )
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    if RECOMMEND_BACKEND == "index":
+        candidate_index.invalidate()
+    await bump_candidate_pool_version()
 
     return db_user
 
@@ -114,13 +162,15 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
 from fastapi.security import OAuth2PasswordRequestForm
 
 @app.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.email == form_data.username).first()
+    user = await db.scalar(select(User).where(User.email == form_data.username))
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    if not user or not await run_in_threadpool(
+        verify_password, form_data.password, user.hashed_password
+    ):
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     access_token = create_access_token(data={"sub": user.user_id})
@@ -133,18 +183,30 @@ def login(
 # ----------------------------
 
 @app.post("/recommend", response_model=RecommendResponse)
-def recommend(
+async def recommend(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Return the top 5 compatible travel companions (requires authentication)."""
 
-    matches = find_matches(current_user, db)
+    try:
+        cache_key, body, pool_version = await lookup_recommendations(current_user)
+    except RateLimitExceeded as exc:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many recommendation requests, please try again later",
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    if body is None:
+        matches = await find_matches(current_user, db, pool_version=pool_version)
+        body = orjson.dumps({
+            "total_matches": len(matches),
+            "matches": matches,
+        }, option=orjson.OPT_UTC_Z)
+        await cache_recommendations(cache_key, body)
 
-    return {
-        "total_matches": len(matches),
-        "matches": matches,
-    }
+    return json_response(body)
 
 
 # ----------------------------
@@ -152,15 +214,15 @@ def recommend(
 # ----------------------------
 
 @app.get("/matches", response_model=MatchListResponse)
-def list_matches(
+async def list_matches(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Return all pending and accepted matches for the authenticated user.
 
     Each match includes the other user's basic info (user_id, name).
     """
-    matches = get_user_matches(db, current_user.user_id)
+    matches = await get_user_matches(db, current_user.user_id)
     return {"total": len(matches), "matches": matches}
 
 
@@ -169,26 +231,27 @@ def list_matches(
 # ----------------------------
 
 @app.post("/matches/accept", response_model=MatchResponse, status_code=201)
-def accept_match(
+async def accept_match(
     body: AcceptMatchRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Create a pending match between the current user and another user.
 
     If a match already exists between the pair, the existing match is
-    returned (no duplicate is created).
+    returned (no duplicate is created).  ``user1_id``/``user2_id`` are
+    stored in sorted order, not requester first.
     """
 
     if body.matched_user_id == current_user.user_id:
         raise HTTPException(status_code=400, detail="Cannot match with yourself")
 
     # Verify the matched user exists
-    other = db.query(User).filter(User.user_id == body.matched_user_id).first()
+    other = await db.get(User, body.matched_user_id)
     if not other:
         raise HTTPException(status_code=404, detail="Matched user not found")
 
-    match, created = store_match(
+    match, created = await store_match(
         db,
         user1_id=current_user.user_id,
         user2_id=body.matched_user_id,
@@ -203,11 +266,11 @@ def accept_match(
 # ----------------------------
 
 @app.patch("/matches/{match_id}/status", response_model=MatchResponse)
-def change_match_status(
+async def change_match_status(
     match_id: int,
     body: UpdateMatchStatusRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Update the status of an existing match.
 
@@ -215,7 +278,7 @@ def change_match_status(
     Valid statuses: pending, accepted, rejected, cancelled.
     """
     try:
-        match = update_match_status(
+        match = await update_match_status(
             db,
             match_id=match_id,
             new_status=body.status,
@@ -1,10 +1,11 @@
 ﻿from datetime import datetime, timedelta, timezone
 
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import SECRET_KEY
 from database import get_db
@@ -13,9 +14,16 @@ from models import User
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# Argon2id at the OWASP minimum (19 MiB, 2 passes, 1 lane) keeps each
+# hash/verify in the low tens of milliseconds.  Existing hashes encode
+# their own parameters and remain verifiable.
 pwd_context = CryptContext(
     schemes=["argon2"],
     deprecated="auto",
+    argon2__type="ID",
+    argon2__time_cost=2,
+    argon2__memory_cost=19456,
+    argon2__parallelism=1,
 )
 
 
@@ -40,18 +48,18 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def authenticate_user(db: Session, user_id: str, password: str):
-    user = db.query(User).filter(User.user_id == user_id).first()
+async def authenticate_user(db: AsyncSession, user_id: str, password: str):
+    user = await db.get(User, user_id)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await run_in_threadpool(verify_password, password, user.hashed_password):
         return False
     return user
 
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,7 +75,7 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.user_id == user_id).first()
+    user = await db.get(User, user_id)
     if user is None:
         raise credentials_exception
 
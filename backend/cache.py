@@ -0,0 +1,139 @@
+"""
+Redis cache for /recommend responses.
+
+Entries are keyed by the requesting user's matching profile and a
+candidate-pool version counter:
+
+    reco:{user_id}:{blake2b(profile)}:{pool_version}
+
+Any write to ``users`` bumps the pool version, which orphans every
+cached recommendation at once; orphaned keys expire after
+``RECOMMEND_CACHE_TTL_SECONDS``.  The version is also handed to
+:mod:`candidate_index`, which rebuilds a snapshot loaded before it, so a
+result cached under a new version never comes from an older pool.
+
+The same Redis also rate-limits /recommend per user with a fixed
+one-minute window (``rate:{user_id}:{minute}``).  The rate check, the
+pool-version read and the cache read run as one Lua script, so a
+lookup costs a single round trip.
+
+Both are optional.  Without ``REDIS_URL`` every lookup misses and no
+limit applies, and Redis errors are logged and treated the same way so
+recommendations are still served.
+"""
+
+import hashlib
+import logging
+import time
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from config import RECOMMEND_CACHE_TTL_SECONDS, RECOMMEND_RATE_LIMIT, REDIS_URL
+from models import User
+
+logger = logging.getLogger(__name__)
+
+POOL_VERSION_KEY = "reco:pool_version"
+RATE_WINDOW_SECONDS = 60
+
+_redis = aioredis.from_url(REDIS_URL) if REDIS_URL else None
+
+# KEYS[1] rate counter, KEYS[2] pool version
+# ARGV[1] limit (0 = unlimited), ARGV[2] window seconds, ARGV[3] cache key prefix
+# Returns {0} when over the limit, else {1, cache_key, pool_version, cached_body or nil}.
+_LOOKUP_SCRIPT = """
+local limit = tonumber(ARGV[1])
+if limit > 0 then
+    local hits = redis.call('INCR', KEYS[1])
+    if hits == 1 then
+        redis.call('EXPIRE', KEYS[1], ARGV[2])
+    end
+    if hits > limit then
+        return {0}
+    end
+end
+local version = redis.call('GET', KEYS[2]) or '0'
+local key = ARGV[3] .. version
+return {1, key, version, redis.call('GET', key)}
+"""
+
+_lookup = _redis.register_script(_LOOKUP_SCRIPT) if _redis is not None else None
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a user has used up this window's /recommend requests."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Rate limit exceeded; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _profile_hash(user: User) -> str:
+    fields = (
+        user.destination,
+        user.start_date,
+        user.end_date,
+        user.budget_range,
+        user.interests,
+        user.travel_style,
+    )
+    raw = "\x1f".join("" if f is None else str(f) for f in fields)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+async def lookup_recommendations(
+    user: User,
+) -> tuple[str | None, bytes | None, int | None]:
+    """Count a /recommend request against *user*'s rate limit and look up
+    the cached response.
+
+    Returns:
+        A tuple of ``(cache_key, body, pool_version)``.  *cache_key* and
+        *pool_version* are None when caching is unavailable; *body* is
+        None on a miss.
+
+    Raises:
+        RateLimitExceeded: *user* has exceeded ``RECOMMEND_RATE_LIMIT``
+            requests in the current window.
+    """
+    if _redis is None:
+        return None, None, None
+
+    now = int(time.time())
+    try:
+        reply = await _lookup(
+            keys=[f"rate:{user.user_id}:{now // RATE_WINDOW_SECONDS}", POOL_VERSION_KEY],
+            args=[
+                RECOMMEND_RATE_LIMIT,
+                RATE_WINDOW_SECONDS,
+                f"reco:{user.user_id}:{_profile_hash(user)}:",
+            ],
+        )
+    except RedisError:
+        logger.warning("Redis unavailable; skipping rate limit and recommendation cache", exc_info=True)
+        return None, None, None
+
+    if not reply[0]:
+        raise RateLimitExceeded(RATE_WINDOW_SECONDS - now % RATE_WINDOW_SECONDS)
+    return reply[1].decode(), reply[3], int(reply[2])
+
+
+async def cache_recommendations(key: str | None, body: bytes) -> None:
+    """Store an encoded /recommend response body."""
+    if key is None:
+        return
+    try:
+        await _redis.setex(key, RECOMMEND_CACHE_TTL_SECONDS, body)
+    except RedisError:
+        logger.warning("Redis SETEX failed for %s", key, exc_info=True)
+
+
+async def bump_candidate_pool_version() -> None:
+    """Invalidate every cached recommendation after a write to ``users``."""
+    if _redis is None:
+        return
+    try:
+        await _redis.incr(POOL_VERSION_KEY)
+    except RedisError:
+        logger.warning("Redis INCR failed; cached recommendations may be stale", exc_info=True)
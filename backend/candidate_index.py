@@ -0,0 +1,354 @@
+"""
+In-memory candidate index for Smart Travel Companion Finder.
+
+Holds a structure-of-arrays snapshot of every discoverable user so that
+``/recommend`` scores the whole pool with a few NumPy operations instead
+of materialising one ORM object per candidate per request.
+
+The index is process-local.  Writes handled by this process mark it
+dirty and the next read rebuilds it; writes handled by other workers are
+picked up as soon as a request carries a newer Redis pool version (see
+:mod:`cache`), or otherwise once the snapshot is older than
+``CANDIDATE_INDEX_TTL_SECONDS``.
+
+If numba is installed, scoring runs as a single parallel JIT loop over
+the arrays instead of one NumPy pass (and temporary array) per criterion.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+from sqlalchemy import select
+
+from config import CANDIDATE_INDEX_TTL_SECONDS
+from matching import WEIGHTS, _to_float
+from models import User
+
+try:
+    import numba
+    from numba import njit, prange
+except ImportError:  # numba is optional; fall back to plain NumPy
+    njit = None
+else:
+    # TBB's pool blocks interpreter exit once a non-main thread has
+    # launched a parallel kernel; kernels here only ever run on the
+    # event-loop thread, so the simpler layers are enough.
+    numba.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+# ──────────────────────────────
+# Array helpers
+# ──────────────────────────────
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:
+    _M1 = np.uint64(0x5555555555555555)
+    _M2 = np.uint64(0x3333333333333333)
+    _M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+    _H01 = np.uint64(0x0101010101010101)
+
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        """SWAR popcount for uint64 arrays (NumPy < 2.0 fallback)."""
+        x = x - ((x >> np.uint64(1)) & _M1)
+        x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+        x = (x + (x >> np.uint64(4))) & _M4
+        return (x * _H01) >> np.uint64(56)
+
+
+def _encode(values: list[str]) -> tuple[np.ndarray, dict[str, int]]:
+    """Map strings to dense int32 category codes."""
+    categories: dict[str, int] = {}
+    codes = np.fromiter(
+        (categories.setdefault(v, len(categories)) for v in values),
+        dtype=np.int32,
+        count=len(values),
+    )
+    return codes, categories
+
+
+def _as_percentage(score: np.ndarray) -> np.ndarray:
+    """Scale 0–1 scores to 0–100 rounded to 2 places, in place."""
+    score *= 100
+    return np.round(score, 2, out=score)
+
+
+# ──────────────────────────────
+# JIT kernel (numba only)
+# ──────────────────────────────
+
+_WEIGHT_VECTOR = np.array(
+    [WEIGHTS[k] for k in ("destination", "dates", "budget", "interests", "travel_style")],
+    dtype=np.float64,
+)
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _bit_count(x):
+        count = 0
+        while x:
+            x &= x - 1
+            count += 1
+        return count
+
+    @njit(parallel=True, cache=True)
+    def _score_kernel(
+        rows,
+        destinations, dest_code,
+        starts, ends, has_dates, has_user_dates, s1, e1,
+        budgets, b1,
+        interest_bits, u_bits,
+        styles, style_code,
+        weights,
+    ):
+        """Weighted compatibility of each of *rows*, unscaled and unrounded.
+
+        Terms are added in the same order as ``CandidateSnapshot.score``
+        so both paths produce identical floats.
+        """
+        n = rows.shape[0]
+        out = np.empty(n, dtype=np.float64)
+        trip_days = e1 - s1 + 1
+        u_count = _bit_count(u_bits)
+        for j in prange(n):
+            i = rows[j]
+            score = 0.0
+            if destinations[i] == dest_code:
+                score += weights[0]
+            if has_user_dates and trip_days > 0 and has_dates[i]:
+                overlap = min(e1, ends[i]) - max(s1, starts[i]) + 1
+                score += weights[1] * (max(overlap, 0) / trip_days)
+            b2 = budgets[i]
+            if b1 != 0 and b2 != 0:
+                similarity = 1 - abs(b1 - b2) / max(b1, b2)
+                score += weights[2] * max(similarity, 0.0)
+            o_bits = interest_bits[i]
+            if u_count and o_bits:
+                union = _bit_count(o_bits | u_bits)
+                score += weights[3] * (_bit_count(o_bits & u_bits) / max(union, 1))
+            if styles[i] == style_code:
+                score += weights[4]
+            out[j] = score
+        return out
+
+else:
+    _score_kernel = None
+
+
+# ──────────────────────────────
+# Snapshot
+# ──────────────────────────────
+
+class CandidateSnapshot:
+    """Immutable column arrays for one load of the discoverable users."""
+
+    def __init__(self, rows: list) -> None:
+        n = len(rows)
+
+        self.user_ids = np.array([r.user_id for r in rows], dtype=object)
+        self.names = np.array([r.name for r in rows], dtype=object)
+        self.rows = {user_id: i for i, user_id in enumerate(self.user_ids)}
+
+        self.destinations, self.destination_codes = _encode(
+            [r.destination_norm for r in rows]
+        )
+        self.styles, self.style_codes = _encode([r.travel_style_norm for r in rows])
+
+        self.starts = np.zeros(n, dtype=np.int64)
+        self.ends = np.zeros(n, dtype=np.int64)
+        self.has_dates = np.zeros(n, dtype=bool)
+        for i, r in enumerate(rows):
+            if r.start_day is not None and r.end_day is not None:
+                self.starts[i], self.ends[i], self.has_dates[i] = r.start_day, r.end_day, True
+
+        self.budgets = np.array([_to_float(r.budget_range) for r in rows], dtype=np.float64)
+
+        self.interest_bits = np.array(
+            [r.interests_bits or 0 for r in rows], dtype=np.uint64
+        )
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    @classmethod
+    async def load(cls, db: "AsyncSession") -> "CandidateSnapshot":
+        result = await db.execute(
+            select(
+                User.user_id,
+                User.name,
+                User.destination_norm,
+                User.start_day,
+                User.end_day,
+                User.budget_range,
+                User.interests_bits,
+                User.travel_style_norm,
+            ).where(User.discoverable == True)
+        )
+        return cls(result.all())
+
+    def prefilter(self, user: dict) -> np.ndarray:
+        """Return the rows worth scoring for *user*.
+
+        A candidate must share the user's destination or overlap their
+        trip dates; anyone else can reach at most 55 points and is
+        dropped before any budget or interest work.
+        """
+        dest_code = self.destination_codes.get(user.get("destination_norm"), -1)
+        keep = self.destinations == dest_code
+
+        s1, e1 = user.get("start_day"), user.get("end_day")
+        if s1 is not None and e1 is not None and e1 >= s1:
+            keep |= (
+                self.has_dates
+                & (self.starts <= e1)
+                & (self.ends >= s1)
+                & (self.starts <= self.ends)
+            )
+        return np.flatnonzero(keep)
+
+    def score(self, user: dict, rows: np.ndarray) -> np.ndarray:
+        """Return the 0–100 compatibility score of each of *rows* for *user*.
+
+        Destination and travel style score on exact match, dates on the
+        share of *user*'s trip the candidate overlaps, budget on relative
+        difference and interests on the Jaccard index of the bitmasks.
+        """
+        if _score_kernel is not None:
+            return self._score_jit(user, rows)
+
+        score = np.zeros(len(rows), dtype=np.float64)
+
+        # Destination
+        dest_code = self.destination_codes.get(user.get("destination_norm"), -1)
+        score += WEIGHTS["destination"] * (self.destinations[rows] == dest_code)
+
+        # Date overlap, as a share of the current user's trip
+        s1, e1 = user.get("start_day"), user.get("end_day")
+        if s1 is not None and e1 is not None and e1 >= s1:
+            overlap = np.minimum(e1, self.ends[rows]) - np.maximum(s1, self.starts[rows]) + 1
+            ratio = np.maximum(overlap, 0) / (e1 - s1 + 1)
+            score += WEIGHTS["dates"] * np.where(self.has_dates[rows], ratio, 0.0)
+
+        # Budget similarity
+        b1 = _to_float(user.get("budget_range"))
+        if b1 != 0:
+            budgets = self.budgets[rows]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                similarity = 1 - np.abs(b1 - budgets) / np.maximum(b1, budgets)
+            score += WEIGHTS["budget"] * np.where(
+                budgets != 0, np.maximum(similarity, 0), 0.0
+            )
+
+        # Interest similarity (Jaccard over bitmasks)
+        u_bits = np.uint64(user.get("interests_bits") or 0)
+        if u_bits:
+            bits = self.interest_bits[rows]
+            inter = _popcount(bits & u_bits)
+            union = _popcount(bits | u_bits)
+            score += WEIGHTS["interests"] * np.where(
+                bits != 0, inter / np.maximum(union, 1), 0.0
+            )
+
+        # Travel style
+        style_code = self.style_codes.get(user.get("travel_style_norm"), -1)
+        score += WEIGHTS["travel_style"] * (self.styles[rows] == style_code)
+
+        return _as_percentage(score)
+
+    def _score_jit(self, user: dict, rows: np.ndarray) -> np.ndarray:
+        s1, e1 = user.get("start_day"), user.get("end_day")
+        has_user_dates = s1 is not None and e1 is not None
+        score = _score_kernel(
+            rows,
+            self.destinations,
+            self.destination_codes.get(user.get("destination_norm"), -1),
+            self.starts,
+            self.ends,
+            self.has_dates,
+            has_user_dates,
+            s1 if has_user_dates else 0,
+            e1 if has_user_dates else 0,
+            self.budgets,
+            _to_float(user.get("budget_range")),
+            # Only the low INTEREST_INDEX bits are ever set.
+            self.interest_bits.view(np.int64),
+            int(user.get("interests_bits") or 0),
+            self.styles,
+            self.style_codes.get(user.get("travel_style_norm"), -1),
+            _WEIGHT_VECTOR,
+        )
+        return _as_percentage(score)
+
+
+# ──────────────────────────────
+# Process-wide index
+# ──────────────────────────────
+
+class CandidateIndex:
+    """Lazily rebuilt holder of the current snapshot.
+
+    Readers never wait while the snapshot is fresh; an ``asyncio.Lock``
+    ensures only one coroutine reloads it when it goes stale.
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl = ttl_seconds
+        self._lock = asyncio.Lock()
+        self._snapshot: CandidateSnapshot | None = None
+        self._built_at = 0.0
+        self._pool_version = 0
+        self._dirty = True
+
+    def invalidate(self) -> None:
+        """Mark the snapshot stale; the next read rebuilds it."""
+        self._dirty = True
+
+    def _is_stale(self, pool_version: int | None = None) -> bool:
+        return (
+            self._snapshot is None
+            or self._dirty
+            or (pool_version is not None and pool_version > self._pool_version)
+            or time.monotonic() - self._built_at > self._ttl
+        )
+
+    async def _load(
+        self, db: "AsyncSession", pool_version: int | None = None
+    ) -> CandidateSnapshot:
+        # Cleared before loading so an invalidate() racing the load
+        # is not lost.  The pool version is bumped only after the write
+        # commits, so this load sees every write up to pool_version.
+        self._dirty = False
+        if pool_version is not None:
+            self._pool_version = max(self._pool_version, pool_version)
+        snapshot = await CandidateSnapshot.load(db)
+        self._snapshot = snapshot
+        self._built_at = time.monotonic()
+        return snapshot
+
+    async def rebuild(self, db: "AsyncSession") -> CandidateSnapshot:
+        async with self._lock:
+            return await self._load(db)
+
+    async def snapshot(
+        self, db: "AsyncSession", pool_version: int | None = None
+    ) -> CandidateSnapshot:
+        """Return a fresh snapshot, rebuilding it if dirty, expired or
+        loaded before *pool_version*."""
+        if not self._is_stale(pool_version):
+            return self._snapshot
+        async with self._lock:
+            # Another coroutine may have rebuilt it while we waited.
+            if self._is_stale(pool_version):
+                return await self._load(db, pool_version)
+            return self._snapshot
+
+
+candidate_index = CandidateIndex(ttl_seconds=CANDIDATE_INDEX_TTL_SECONDS)
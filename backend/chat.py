@@ -3,28 +3,35 @@ Chat endpoints for Smart Travel Companion Finder.
 
 POST /chat/send              – Send a message (requires accepted match)
 GET  /chat/conversations     – List all conversation partners with last message
-GET  /chat/{other_user_id}   – Retrieve conversation history
+GET  /chat/{other_user_id}   – Retrieve conversation history (paginated)
 """
 
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import case, func, or_
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import case, exists, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from auth import get_current_user
 from database import get_db
+from message_batcher import message_batcher
 from models import Match, Message, User
-from schemas import ChatMessageCreate, ChatMessageResponse, ConversationSummary
+from responses import json_response
+from schemas import (
+    ChatMessageCreate,
+    ChatMessageResponse,
+    ConversationHistoryResponse,
+    ConversationSummary,
+)
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
 @router.post("/send", response_model=ChatMessageResponse)
-def send_message(
+async def send_message(
     body: ChatMessageCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Send a message to another user.
 
@@ -34,45 +41,43 @@ def send_message(
     if body.receiver_id == current_user.user_id:
         raise HTTPException(status_code=400, detail="Cannot message yourself")
 
-    # Verify receiver exists
-    receiver = db.query(User).filter(User.user_id == body.receiver_id).first()
-    if not receiver:
-        raise HTTPException(status_code=404, detail="Receiver not found")
-
-    # Check for an accepted match between the two users
-    accepted_match = (
-        db.query(Match)
-        .filter(
-            Match.status == "accepted",
-            or_(
-                (Match.user1_id == current_user.user_id) & (Match.user2_id == body.receiver_id),
-                (Match.user1_id == body.receiver_id) & (Match.user2_id == current_user.user_id),
-            ),
+    # Check for an accepted match between the two users.  A match implies
+    # the receiver exists, so the happy path is this single EXISTS query.
+    # Pairs are stored sorted (see store_match), so one equality on the
+    # sorted pair is a uq_matches_pair lookup.
+    user1_id, user2_id = sorted((current_user.user_id, body.receiver_id))
+    has_accepted_match = await db.scalar(
+        select(
+            exists().where(
+                Match.user1_id == user1_id,
+                Match.user2_id == user2_id,
+                Match.status == "accepted",
+            )
         )
-        .first()
     )
-    if not accepted_match:
+    if not has_accepted_match:
+        if await db.get(User, body.receiver_id) is None:
+            raise HTTPException(status_code=404, detail="Receiver not found")
         raise HTTPException(
             status_code=403,
             detail="You can only message users with an accepted match",
         )
 
-    message = Message(
-        sender_id=current_user.user_id,
-        receiver_id=body.receiver_id,
-        message_text=body.message_text,
-    )
-    db.add(message)
-    db.commit()
-    db.refresh(message)
+    sender_id = current_user.user_id
+
+    # Hand the pooled connection back before waiting on the batch: the
+    # writer needs one of its own, and senders holding theirs while they
+    # wait would starve it once they fill the pool.
+    await db.close()
 
-    return message
+    # Committed together with other senders' messages; see message_batcher.
+    return await message_batcher.submit(sender_id, body.receiver_id, body.message_text)
 
 
 @router.get("/conversations", response_model=List[ConversationSummary])
-def list_conversations(
+async def list_conversations(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Return a de-duplicated list of users the current user has chatted with,
     including the last message and its timestamp, sorted by most recent first."""
@@ -83,64 +88,89 @@ def list_conversations(
     other_id = case(
         (Message.sender_id == uid, Message.receiver_id),
         else_=Message.sender_id,
-    ).label("other_id")
+    )
 
-    # Subquery: latest message_id per conversation partner
-    sub = (
-        db.query(
-            other_id,
-            func.max(Message.message_id).label("last_msg_id"),
+    # Rank each partner's messages newest first in a single pass
+    ranked = (
+        select(
+            other_id.label("other_id"),
+            Message.message_text,
+            Message.timestamp,
+            func.row_number()
+            .over(
+                partition_by=other_id,
+                order_by=(Message.timestamp.desc(), Message.message_id.desc()),
+            )
+            .label("rn"),
         )
-        .filter(or_(Message.sender_id == uid, Message.receiver_id == uid))
-        .group_by(other_id)
+        .where(or_(Message.sender_id == uid, Message.receiver_id == uid))
         .subquery()
     )
 
-    # Join back to Message + User to get full details
-    rows = (
-        db.query(
-            sub.c.other_id,
+    result = await db.execute(
+        select(
+            ranked.c.other_id,
             User.name,
-            Message.message_text,
-            Message.timestamp,
+            ranked.c.message_text,
+            ranked.c.timestamp,
         )
-        .select_from(sub)
-        .join(Message, Message.message_id == sub.c.last_msg_id)
-        .join(User, User.user_id == sub.c.other_id)
-        .order_by(Message.timestamp.desc())
-        .all()
+        .join(User, User.user_id == ranked.c.other_id)
+        .where(ranked.c.rn == 1)
+        .order_by(ranked.c.timestamp.desc())
     )
 
-    return [
-        ConversationSummary(
-            user_id=row.other_id,
-            name=row.name,
-            last_message=row.message_text,
-            last_message_timestamp=row.timestamp,
-        )
-        for row in rows
-    ]
+    return json_response([
+        {
+            "user_id": row.other_id,
+            "name": row.name,
+            "last_message": row.message_text,
+            "last_message_timestamp": row.timestamp,
+        }
+        for row in result.all()
+    ])
 
 
-@router.get("/{other_user_id}", response_model=List[ChatMessageResponse])
-def get_conversation(
+@router.get("/{other_user_id}", response_model=ConversationHistoryResponse)
+async def get_conversation(
     other_user_id: str,
+    before: Optional[int] = Query(None, description="Return messages older than this message_id"),
+    limit: int = Query(50, ge=1, le=200),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    """Return the full conversation between the current user and another user,
-    sorted by timestamp ascending."""
-
-    messages = (
-        db.query(Message)
-        .filter(
-            or_(
-                (Message.sender_id == current_user.user_id) & (Message.receiver_id == other_user_id),
-                (Message.sender_id == other_user_id) & (Message.receiver_id == current_user.user_id),
-            ),
-        )
-        .order_by(Message.timestamp.asc())
-        .all()
+    """Return one page of the conversation between the current user and
+    another user, oldest first.
+
+    Pages are walked backwards from the newest message: pass the returned
+    ``next_cursor`` as ``before`` to fetch older messages.  ``next_cursor``
+    is null once the start of the conversation is reached.
+    """
+
+    query = select(
+        Message.message_id,
+        Message.sender_id,
+        Message.receiver_id,
+        Message.message_text,
+        Message.timestamp,
+    ).where(
+        or_(
+            (Message.sender_id == current_user.user_id) & (Message.receiver_id == other_user_id),
+            (Message.sender_id == other_user_id) & (Message.receiver_id == current_user.user_id),
+        ),
     )
+    if before is not None:
+        query = query.where(Message.message_id < before)
+
+    # Fetch one extra row to learn whether an older page exists
+    result = await db.execute(
+        query.order_by(Message.message_id.desc()).limit(limit + 1)
+    )
+    messages = [row._asdict() for row in result.all()]
+
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = messages[-1]["message_id"]
 
-    return messages
+    messages.reverse()
+    return json_response({"messages": messages, "next_cursor": next_cursor})
@@ -14,8 +14,43 @@ load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
 SECRET_KEY = os.getenv("SECRET_KEY")
 
+# Connection pool sizing (ignored for SQLite).  Set DB_USE_PGBOUNCER=1
+# when DATABASE_URL points at PgBouncer in transaction-pool mode so it,
+# not SQLAlchemy, does the pooling.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+DB_USE_PGBOUNCER = os.getenv("DB_USE_PGBOUNCER", "").lower() in ("1", "true", "yes")
+
+# Seconds before a worker's in-memory candidate index is reloaded, so
+# registrations handled by other workers become visible.
+CANDIDATE_INDEX_TTL_SECONDS = float(os.getenv("CANDIDATE_INDEX_TTL_SECONDS", "60"))
+
+# Where /recommend scores candidates: "index" (in-memory NumPy index) or
+# "sql" (top-N computed inside PostgreSQL).
+RECOMMEND_BACKEND = os.getenv("RECOMMEND_BACKEND", "index")
+
+# Optional Redis cache for /recommend results (disabled when unset).
+REDIS_URL = os.getenv("REDIS_URL")
+RECOMMEND_CACHE_TTL_SECONDS = int(os.getenv("RECOMMEND_CACHE_TTL_SECONDS", "600"))
+
+# Per-user /recommend requests allowed per minute (needs REDIS_URL; 0 disables).
+RECOMMEND_RATE_LIMIT = int(os.getenv("RECOMMEND_RATE_LIMIT", "30"))
+
+# /chat/send messages are committed in batches of up to MESSAGE_BATCH_MAX_SIZE,
+# waiting at most MESSAGE_BATCH_WINDOW_SECONDS for a batch to fill.
+MESSAGE_BATCH_MAX_SIZE = int(os.getenv("MESSAGE_BATCH_MAX_SIZE", "100"))
+MESSAGE_BATCH_WINDOW_SECONDS = float(os.getenv("MESSAGE_BATCH_WINDOW_SECONDS", "0.005"))
+
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL environment variable is not set")
 
 if not SECRET_KEY:
     raise RuntimeError("SECRET_KEY environment variable is not set")
+
+if RECOMMEND_BACKEND not in ("index", "sql"):
+    raise RuntimeError("RECOMMEND_BACKEND must be 'index' or 'sql'")
+
+if RECOMMEND_BACKEND == "sql" and not DATABASE_URL.startswith("postgresql"):
+    raise RuntimeError("RECOMMEND_BACKEND=sql requires a PostgreSQL DATABASE_URL")
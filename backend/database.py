@@ -1,22 +1,60 @@
-﻿from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+﻿from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import NullPool
 
-from config import DATABASE_URL
+from config import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_USE_PGBOUNCER,
+)
 
-connect_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    connect_args["check_same_thread"] = False
+# Plain sqlite:// and postgresql:// URLs are mapped onto their async
+# drivers so existing .env files keep working.
+ASYNC_DRIVERS = {
+    "sqlite://": "sqlite+aiosqlite://",
+    "postgresql://": "postgresql+asyncpg://",
+}
 
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+database_url = DATABASE_URL
+for prefix, async_prefix in ASYNC_DRIVERS.items():
+    if database_url.startswith(prefix):
+        database_url = async_prefix + database_url[len(prefix):]
+        break
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine_options = {}
+if database_url.startswith("sqlite"):
+    pass
+elif DB_USE_PGBOUNCER:
+    # PgBouncer owns the pool; asyncpg's prepared statement caches do not
+    # survive transaction-mode connection switching, so disable them.
+    engine_options.update(
+        poolclass=NullPool,
+        connect_args={"statement_cache_size": 0, "prepared_statement_cache_size": 0},
+    )
+else:
+    engine_options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+engine = create_async_engine(database_url, **engine_options)
+
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
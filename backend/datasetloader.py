@@ -2,7 +2,7 @@
 Smart Travel Companion Finder Backend
 
 This module loads travel_companion_finder_dataset_.csv.xlsx
-using pandas.
+using pyarrow's multithreaded CSV reader.
 
 Requirements:
 - Convert start_date and end_date columns to datetime
@@ -11,7 +11,14 @@ Requirements:
 """
 
 import os
+
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pa_csv
+
+DATE_COLUMNS = ("start_date", "end_date")
+DATE_FORMAT = "%d-%m-%Y"
 
 
 def load_dataset(filepath: str = None) -> pd.DataFrame:
@@ -37,22 +44,27 @@ def load_dataset(filepath: str = None) -> pd.DataFrame:
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"Dataset not found: {filepath}")
 
-    df = pd.read_csv(filepath)
+    # Date columns are read as text and parsed below, so malformed
+    # dates become nulls instead of failing the whole read.
+    table = pa_csv.read_csv(
+        filepath,
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in DATE_COLUMNS},
+            # Empty / "NA"-style cells load as NaN, as with pd.read_csv
+            strings_can_be_null=True,
+        ),
+    )
 
     # Convert date columns safely
-    if "start_date" in df.columns:
-        df["start_date"] = pd.to_datetime(
-            df["start_date"],
-            format="%d-%m-%Y",
-            errors="coerce"
-        )
-
-    if "end_date" in df.columns:
-        df["end_date"] = pd.to_datetime(
-            df["end_date"],
-            format="%d-%m-%Y",
-            errors="coerce"
-        )
+    for name in DATE_COLUMNS:
+        if name in table.column_names:
+            parsed = pc.strptime(
+                table[name],
+                format=DATE_FORMAT,
+                unit="us",
+                error_is_null=True,
+            )
+            table = table.set_column(table.schema.get_field_index(name), name, parsed)
 
-    return df
+    return table.to_pandas()
 
@@ -13,12 +13,19 @@ All queries use SQLAlchemy sessions — no pandas or CSV.
 
 from __future__ import annotations
 
+from datetime import date
 from typing import TYPE_CHECKING
 
+import numpy as np
+from sqlalchemy import or_, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import RECOMMEND_BACKEND
 from models import Match, User
 
 if TYPE_CHECKING:
-    from sqlalchemy.orm import Session
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 
 # ──────────────────────────────
@@ -46,40 +53,65 @@ def _to_float(value) -> float:
     return 0.0
 
 
-def _jaccard(set1: set, set2: set) -> float:
-    if not set1 or not set2:
-        return 0.0
-    return len(set1 & set2) / len(set1 | set2)
+def _interest_set(value) -> set[str]:
+    """Split a pipe-delimited interests string into a normalised set."""
+    return {_norm(i) for i in str(value or "").split("|") if i.strip()}
+
+
+# Supported interests and their bit positions in ``User.interests_bits``.
+# Append only: positions are persisted, so never reorder or remove.
+INTEREST_INDEX: dict[str, int] = {
+    name: bit
+    for bit, name in enumerate((
+        "adventure",
+        "culture",
+        "food",
+        "nature",
+        "history",
+        "beaches",
+        "hiking",
+        "nightlife",
+        "photography",
+        "shopping",
+        "wellness",
+        "wildlife",
+        "art",
+        "music",
+        "sports",
+    ))
+}
 
 
-def _date_overlap(start1, end1, start2, end2) -> float:
-    """Return 0.0–1.0 ratio of overlapping days to the first user's trip."""
-    try:
-        if start1 > end2 or start2 > end1:
-            return 0.0
-        overlap_start = max(start1, start2)
-        overlap_end = min(end1, end2)
-        overlap_days = (overlap_end - overlap_start).days + 1
-        total_days = (end1 - start1).days + 1
-        if total_days <= 0:
-            return 0.0
-        return max(overlap_days / total_days, 0)
-    except Exception:
-        return 0.0
+def interest_bits(value) -> int:
+    """Pack a pipe-delimited interests string into an INTEREST_INDEX bitmask.
+
+    Interests outside the vocabulary are ignored; ``UserCreate`` rejects
+    them before they reach the database.
+    """
+    bits = 0
+    for interest in _interest_set(value):
+        if interest in INTEREST_INDEX:
+            bits |= 1 << INTEREST_INDEX[interest]
+    return bits
 
 
-def _budget_similarity(b1, b2) -> float:
-    b1, b2 = _to_float(b1), _to_float(b2)
-    if b1 == 0 or b2 == 0:
-        return 0.0
-    diff = abs(b1 - b2)
-    return max(1 - diff / max(b1, b2), 0)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _day_number(value) -> int | None:
+    """Return a date/datetime as whole days since 1970-01-01, or None."""
+    try:
+        return value.toordinal() - _EPOCH_ORDINAL
+    except AttributeError:
+        return None
 
 
 # ──────────────────────────────
 # Scoring
 # ──────────────────────────────
 
+# Applied by CandidateSnapshot.score (index backend) and _TOP_MATCHES_SQL
+# (sql backend); the two must stay in step.
 WEIGHTS = {
     "destination": 0.25,
     "dates": 0.20,
@@ -89,37 +121,6 @@ WEIGHTS = {
 }
 
 
-def calculate_score(user: dict, other: dict) -> float:
-    """Return a weighted compatibility score on a 0–100 scale."""
-    score = 0.0
-
-    # Destination
-    if _norm(user.get("destination")) == _norm(other.get("destination")):
-        score += WEIGHTS["destination"]
-
-    # Date overlap
-    score += WEIGHTS["dates"] * _date_overlap(
-        user.get("start_date"), user.get("end_date"),
-        other.get("start_date"), other.get("end_date"),
-    )
-
-    # Budget similarity
-    score += WEIGHTS["budget"] * _budget_similarity(
-        user.get("budget_range"), other.get("budget_range"),
-    )
-
-    # Interest similarity (pipe-delimited)
-    u_int = {_norm(i) for i in str(user.get("interests", "")).split("|") if i.strip()}
-    o_int = {_norm(i) for i in str(other.get("interests", "")).split("|") if i.strip()}
-    score += WEIGHTS["interests"] * _jaccard(u_int, o_int)
-
-    # Travel style
-    if _norm(user.get("travel_style")) == _norm(other.get("travel_style")):
-        score += WEIGHTS["travel_style"]
-
-    return round(score * 100, 2)
-
-
 # ──────────────────────────────
 # User model → dict conversion
 # ──────────────────────────────
@@ -129,119 +130,280 @@ def _user_to_dict(user: User) -> dict:
     return {
         "user_id": user.user_id,
         "name": user.name,
-        "destination": user.destination,
-        "start_date": user.start_date,
-        "end_date": user.end_date,
+        "destination_norm": user.destination_norm,
+        "start_day": user.start_day,
+        "end_day": user.end_day,
         "budget_range": user.budget_range,
-        "interests": user.interests,
-        "travel_style": user.travel_style,
+        "interests_bits": user.interests_bits,
+        "travel_style_norm": user.travel_style_norm,
+    }
+
+
+def derived_match_fields(profile) -> dict:
+    """Return the scoring columns precomputed from a profile at write time.
+
+    *profile* is anything with ``destination``, ``start_date``,
+    ``end_date``, ``interests`` and ``travel_style`` attributes (e.g.
+    ``schemas.UserCreate``).
+    """
+    return {
+        "destination_norm": _norm(profile.destination),
+        "start_day": _day_number(profile.start_date),
+        "end_day": _day_number(profile.end_date),
+        "travel_style_norm": _norm(profile.travel_style),
+        "interests_bits": interest_bits(profile.interests),
     }
 
 
+# ──────────────────────────────
+# Top-N selection
+# ──────────────────────────────
+
+def _top_indices(indices: np.ndarray, scores: np.ndarray, top_n: int) -> np.ndarray:
+    """Return up to *top_n* of *indices* ordered by score (descending).
+
+    Uses ``argpartition`` so only the winners are sorted; ties keep
+    their row order.
+    """
+    if top_n <= 0 or indices.size == 0:
+        return indices[:0]
+    if indices.size > top_n:
+        part = np.argpartition(-scores[indices], top_n - 1)[:top_n]
+        indices = np.sort(indices[part])
+    order = np.argsort(-scores[indices], kind="stable")
+    return indices[order]
+
+
+# ──────────────────────────────
+# SQL scoring (PostgreSQL)
+# ──────────────────────────────
+
+# Same weighting and prefilter as the candidate index, evaluated
+# server-side so only the top_n rows leave the database.  Scores are
+# rounded half-to-even exactly like np.round(score, 2) (scale by 100,
+# round, divide); ROUND(numeric) would round ties away from zero.
+_TOP_MATCHES_SQL = text("""
+SELECT user_id, name, score
+FROM (
+    SELECT
+        user_id,
+        name,
+        CASE WHEN scaled - floor(scaled) = 0.5
+             THEN 2 * round(scaled / 2)
+             ELSE round(scaled)
+        END / 100 AS score
+    FROM (
+        SELECT
+            c.user_id,
+            c.name,
+            100 * (
+                CAST(:w_destination AS float) * CASE
+                    WHEN c.destination_norm = :destination
+                    THEN 1 ELSE 0 END
+              + CAST(:w_dates AS float) * CASE
+                    WHEN :has_dates AND c.start_day IS NOT NULL AND c.end_day IS NOT NULL
+                    THEN GREATEST(
+                        LEAST(CAST(:end_day AS integer), c.end_day)
+                      - GREATEST(CAST(:start_day AS integer), c.start_day)
+                      + 1, 0) / CAST(:trip_days AS float)
+                    ELSE 0 END
+              + CAST(:w_budget AS float) * CASE
+                    WHEN CAST(:budget AS float) <> 0 AND coalesce(c.budget_range, 0) <> 0
+                    THEN GREATEST(1 - abs(:budget - c.budget_range)
+                                    / GREATEST(:budget, c.budget_range), 0)
+                    ELSE 0 END
+              + CAST(:w_interests AS float) * CASE
+                    WHEN coalesce(c.interests_bits, 0) <> 0 AND CAST(:interests_bits AS bigint) <> 0
+                    THEN CAST(bit_count(CAST(c.interests_bits & :interests_bits AS bit(64))) AS float)
+                       / bit_count(CAST(c.interests_bits | :interests_bits AS bit(64)))
+                    ELSE 0 END
+              + CAST(:w_travel_style AS float) * CASE
+                    WHEN c.travel_style_norm = :travel_style
+                    THEN 1 ELSE 0 END
+            ) * 100 AS scaled
+        FROM users AS c
+        WHERE c.discoverable AND c.user_id <> :user_id
+          AND (
+              c.destination_norm = :destination
+              OR (:has_dates
+                  AND c.start_day <= :end_day
+                  AND c.end_day >= :start_day
+                  AND c.start_day <= c.end_day)
+          )
+    ) AS raw
+) AS scored
+WHERE score >= :min_score
+ORDER BY score DESC, user_id
+LIMIT :top_n
+""")
+
+
+async def _find_matches_sql(
+    current_user: User,
+    db: "AsyncSession",
+    top_n: int,
+    min_score: float,
+) -> list[dict]:
+    """PostgreSQL implementation of :func:`find_matches`."""
+    start, end = current_user.start_day, current_user.end_day
+    trip_days = None
+    if start is not None and end is not None:
+        trip_days = end - start + 1
+
+    result = await db.execute(
+        _TOP_MATCHES_SQL,
+        {
+            "w_destination": WEIGHTS["destination"],
+            "w_dates": WEIGHTS["dates"],
+            "w_budget": WEIGHTS["budget"],
+            "w_interests": WEIGHTS["interests"],
+            "w_travel_style": WEIGHTS["travel_style"],
+            "user_id": current_user.user_id,
+            "destination": current_user.destination_norm,
+            "has_dates": bool(trip_days and trip_days > 0),
+            "start_day": start,
+            "end_day": end,
+            "trip_days": trip_days,
+            "budget": _to_float(current_user.budget_range),
+            "interests_bits": current_user.interests_bits or 0,
+            "travel_style": current_user.travel_style_norm,
+            "min_score": min_score,
+            "top_n": top_n,
+        },
+    )
+    rows = result.all()
+
+    return [
+        {
+            "user_id": row.user_id,
+            "name": row.name,
+            "compatibility_score": float(row.score),
+        }
+        for row in rows
+    ]
+
+
 # ──────────────────────────────
 # Public API
 # ──────────────────────────────
 
-def find_matches(
+async def find_matches(
     current_user: User,
-    db: "Session",
+    db: "AsyncSession",
     top_n: int = 5,
     min_score: float = 20.0,
+    pool_version: int | None = None,
 ) -> list[dict]:
     """Find the best travel companions from the database.
 
+    Only candidates who share the user's destination or overlap their
+    trip dates are considered.  They are scored in one vectorised pass
+    over the in-memory :mod:`candidate_index` snapshot of discoverable
+    users, or inside PostgreSQL when ``RECOMMEND_BACKEND`` is ``"sql"``.
+
     Args:
         current_user: The authenticated User ORM object.
-        db: SQLAlchemy session.
+        db: Async SQLAlchemy session.
         top_n: Number of top results to return.
         min_score: Minimum compatibility score to include.
+        pool_version: Candidate-pool version read from the recommendation
+            cache; the in-memory snapshot is rebuilt if it predates it.
 
     Returns:
         List of dicts with ``user_id``, ``name``, and
         ``compatibility_score``, sorted descending.
     """
-    # Fetch all discoverable users except the current one
-    candidates = (
-        db.query(User)
-        .filter(User.discoverable == True, User.user_id != current_user.user_id)
-        .all()
-    )
+    if RECOMMEND_BACKEND == "sql":
+        return await _find_matches_sql(current_user, db, top_n, min_score)
 
-    user_dict = _user_to_dict(current_user)
-    results: list[dict] = []
+    from candidate_index import candidate_index
+
+    snapshot = await candidate_index.snapshot(db, pool_version)
+    user = _user_to_dict(current_user)
+    rows = snapshot.prefilter(user)
+    scores = snapshot.score(user, rows)
 
-    for candidate in candidates:
-        score = calculate_score(user_dict, _user_to_dict(candidate))
-        if score >= min_score:
-            results.append(
-                {
-                    "user_id": candidate.user_id,
-                    "name": candidate.name,
-                    "compatibility_score": score,
-                }
-            )
+    eligible = scores >= min_score
+    own_row = snapshot.rows.get(current_user.user_id)
+    if own_row is not None:
+        eligible &= rows != own_row
 
-    results.sort(key=lambda r: r["compatibility_score"], reverse=True)
-    return results[:top_n]
+    return [
+        {
+            "user_id": snapshot.user_ids[rows[i]],
+            "name": snapshot.names[rows[i]],
+            "compatibility_score": float(scores[i]),
+        }
+        for i in _top_indices(np.flatnonzero(eligible), scores, top_n)
+    ]
 
 
 VALID_STATUSES = {"pending", "accepted", "rejected", "cancelled"}
 
+# Dialect-specific INSERT constructs that support ON CONFLICT DO NOTHING
+_INSERT_BY_DIALECT = {
+    "postgresql": postgresql_insert,
+    "sqlite": sqlite_insert,
+}
+
 
-def store_match(
-    db: "Session",
+async def store_match(
+    db: "AsyncSession",
     user1_id: str,
     user2_id: str,
     compatibility_score: float,
 ) -> tuple[Match, bool]:
     """Create a new match with status ``pending``.
 
-    Performs a symmetrical duplicate check (user1↔user2).  If a match
-    already exists between the two users the existing row is returned
-    unchanged.
+    The pair is stored in sorted order, so ``(a, b)`` and ``(b, a)`` hit
+    the same ``uq_matches_pair`` constraint.  The insert is a single
+    ``INSERT ... ON CONFLICT DO NOTHING RETURNING``; only when it loses to
+    an existing row is that row fetched and returned unchanged.
+    Databases with rows from before pairs were sorted must be run
+    through ``upgrade_db.py`` first.
 
     Returns:
         A tuple of ``(match, created)`` where *created* is ``True`` when
         a new row was inserted and ``False`` when an existing one was
         returned.
     """
-    existing = (
-        db.query(Match)
-        .filter(
-            ((Match.user1_id == user1_id) & (Match.user2_id == user2_id))
-            | ((Match.user1_id == user2_id) & (Match.user2_id == user1_id))
+    user1_id, user2_id = sorted((user1_id, user2_id))
+
+    insert = _INSERT_BY_DIALECT[db.bind.dialect.name]
+    new_match = await db.scalar(
+        insert(Match)
+        .values(
+            user1_id=user1_id,
+            user2_id=user2_id,
+            compatibility_score=compatibility_score,
+            status="pending",
         )
-        .first()
+        .on_conflict_do_nothing(index_elements=["user1_id", "user2_id"])
+        .returning(Match)
     )
-    if existing:
-        return existing, False
-
-    new_match = Match(
-        user1_id=user1_id,
-        user2_id=user2_id,
-        compatibility_score=compatibility_score,
-        status="pending",
+    await db.commit()
+    if new_match is not None:
+        return new_match, True
+
+    existing = await db.scalar(
+        select(Match).where(Match.user1_id == user1_id, Match.user2_id == user2_id)
     )
-    db.add(new_match)
-    db.commit()
-    db.refresh(new_match)
-    return new_match, True
+    return existing, False
 
 
-def get_user_matches(
-    db: Session,
+async def get_user_matches(
+    db: "AsyncSession",
     current_user_id: str,
     statuses: tuple[str, ...] = ("pending", "accepted"),
 ) -> list[dict]:
     """Return all matches for *current_user_id* whose status is in *statuses*.
 
-    Uses SQLAlchemy joins to include the other user's basic info.
+    The other user's basic info comes from a join in the same query, so
+    the listing is one round trip however many matches there are (the
+    ``Match.user1``/``user2`` relationships are ``lazy="raise"``).
     """
-    from models import Match, User
-    from sqlalchemy import or_
-
-    rows = (
-        db.query(Match, User)
+    result = await db.execute(
+        select(Match, User)
         .join(
             User,
             or_(
@@ -249,7 +411,7 @@ def get_user_matches(
                 (Match.user2_id == current_user_id) & (Match.user1_id == User.user_id),
             ),
         )
-        .filter(
+        .where(
             or_(
                 Match.user1_id == current_user_id,
                 Match.user2_id == current_user_id,
@@ -257,11 +419,10 @@ def get_user_matches(
             Match.status.in_(statuses),
         )
         .order_by(Match.created_at.desc())
-        .all()
     )
 
     results: list[dict] = []
-    for match, other_user in rows:
+    for match, other_user in result.all():
         results.append(
             {
                 "match_id": match.match_id,
@@ -278,8 +439,8 @@ def get_user_matches(
     return results
 
 
-def update_match_status(
-    db: "Session",
+async def update_match_status(
+    db: "AsyncSession",
     match_id: int,
     new_status: str,
     current_user_id: str,
@@ -287,7 +448,7 @@ def update_match_status(
     """Transition a match to a new status.
 
     Args:
-        db: SQLAlchemy session.
+        db: Async SQLAlchemy session.
         match_id: Primary key of the match to update.
         new_status: Target status (pending / accepted / rejected / cancelled).
         current_user_id: The authenticated user requesting the change;
@@ -305,7 +466,7 @@ def update_match_status(
             f"Invalid status '{new_status}'. Must be one of: {', '.join(sorted(VALID_STATUSES))}"
         )
 
-    match = db.query(Match).filter(Match.match_id == match_id).first()
+    match = await db.get(Match, match_id)
     if not match:
         raise ValueError("Match not found")
 
@@ -314,6 +475,5 @@ def update_match_status(
         raise ValueError("You are not part of this match")
 
     match.status = new_status
-    db.commit()
-    db.refresh(match)
+    await db.commit()
     return match
@@ -0,0 +1,120 @@
+"""
+Batched message writes for Smart Travel Companion Finder.
+
+``/chat/send`` hands each new message to a per-process background task
+instead of committing it on the request's own session.  The task
+collects messages for up to ``MESSAGE_BATCH_WINDOW_SECONDS`` (or until
+``MESSAGE_BATCH_MAX_SIZE`` are waiting), inserts them with one
+multi-row ``INSERT ... RETURNING`` and commits once, so concurrent
+senders share a single transaction (and fsync) instead of paying for
+one each.  Every sender awaits a future that resolves to its own
+committed row, or to the error that failed the batch.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from sqlalchemy import insert
+
+from config import MESSAGE_BATCH_MAX_SIZE, MESSAGE_BATCH_WINDOW_SECONDS
+from database import SessionLocal
+from models import Message
+
+logger = logging.getLogger(__name__)
+
+
+class MessageBatcher:
+    """Queue of pending messages drained by one background writer task."""
+
+    def __init__(self, max_size: int, window_seconds: float) -> None:
+        self._max_size = max_size
+        self._window = window_seconds
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start the writer task on the running event loop (idempotent)."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Write everything already queued, then stop the writer task."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    async def submit(self, sender_id: str, receiver_id: str, message_text: str) -> Message:
+        """Queue a message and wait until the batch holding it commits."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((
+            {
+                "sender_id": sender_id,
+                "receiver_id": receiver_id,
+                "message_text": message_text,
+            },
+            future,
+        ))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+
+            # Keep collecting until the window closes or the batch is full.
+            deadline = loop.time() + self._window
+            while len(batch) < self._max_size:
+                timeout = deadline - loop.time()
+                try:
+                    item = (
+                        self._queue.get_nowait()
+                        if timeout <= 0
+                        else await asyncio.wait_for(self._queue.get(), timeout)
+                    )
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._write(batch)
+
+    async def _write(self, batch: list) -> None:
+        try:
+            async with SessionLocal() as db:
+                messages = (
+                    await db.scalars(
+                        insert(Message).returning(Message, sort_by_parameter_order=True),
+                        [values for values, _ in batch],
+                    )
+                ).all()
+                await db.commit()
+        except Exception as exc:
+            logger.exception("Failed to write a batch of %d messages", len(batch))
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), message in zip(batch, messages):
+            # The sender may have disconnected and cancelled its future.
+            if not future.done():
+                future.set_result(message)
+
+
+message_batcher = MessageBatcher(
+    max_size=MESSAGE_BATCH_MAX_SIZE,
+    window_seconds=MESSAGE_BATCH_WINDOW_SECONDS,
+)
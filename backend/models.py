@@ -5,13 +5,16 @@ SQLAlchemy ORM models for Smart Travel Companion Finder.
 from datetime import datetime, timezone
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import relationship
 
@@ -26,26 +29,37 @@ class User(Base):
     email = Column(String, unique=True, nullable=False, index=True)
     hashed_password = Column(String, nullable=False)
     destination = Column(String)
-    start_date = Column(DateTime)
-    end_date = Column(DateTime)
+    destination_norm = Column(String, default="", index=True)  # lower-cased, stripped
+    start_date = Column(DateTime(timezone=True))
+    end_date = Column(DateTime(timezone=True))
+    start_day = Column(Integer)  # days since 1970-01-01
+    end_day = Column(Integer)
     budget_range = Column(Float)
     interests = Column(String)
+    interests_bits = Column(BigInteger, default=0)  # matching.INTEREST_INDEX bitmask
     travel_style = Column(String)
+    travel_style_norm = Column(String, default="")  # lower-cased, stripped
     discoverable = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
-    # Relationships
+    # Relationships are never loaded implicitly (lazy="raise"): queries
+    # that need related rows must join or use selectinload() explicitly.
     matches_as_user1 = relationship(
-        "Match", foreign_keys="Match.user1_id", back_populates="user1"
+        "Match", foreign_keys="Match.user1_id", back_populates="user1", lazy="raise"
     )
     matches_as_user2 = relationship(
-        "Match", foreign_keys="Match.user2_id", back_populates="user2"
+        "Match", foreign_keys="Match.user2_id", back_populates="user2", lazy="raise"
     )
     sent_messages = relationship(
-        "Message", foreign_keys="Message.sender_id", back_populates="sender"
+        "Message", foreign_keys="Message.sender_id", back_populates="sender", lazy="raise"
     )
     received_messages = relationship(
-        "Message", foreign_keys="Message.receiver_id", back_populates="receiver"
+        "Message", foreign_keys="Message.receiver_id", back_populates="receiver", lazy="raise"
+    )
+
+    # Serves the date-overlap half of the find_matches prefilter.
+    __table_args__ = (
+        Index("ix_users_trip_days", start_day, end_day),
     )
 
 
@@ -57,11 +71,22 @@ class Match(Base):
     user2_id = Column(String, ForeignKey("users.user_id"), nullable=False)
     compatibility_score = Column(Float, nullable=False)
     status = Column(String, default="pending")  # pending / accepted / rejected
-    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # store_match writes pairs sorted, so this dedupes (a, b) / (b, a);
+        # its index also answers sorted-pair lookups such as /chat/send's
+        # accepted-match check.
+        UniqueConstraint(user1_id, user2_id, name="uq_matches_pair"),
+    )
 
     # Relationships
-    user1 = relationship("User", foreign_keys=[user1_id], back_populates="matches_as_user1")
-    user2 = relationship("User", foreign_keys=[user2_id], back_populates="matches_as_user2")
+    user1 = relationship(
+        "User", foreign_keys=[user1_id], back_populates="matches_as_user1", lazy="raise"
+    )
+    user2 = relationship(
+        "User", foreign_keys=[user2_id], back_populates="matches_as_user2", lazy="raise"
+    )
 
 
 class Message(Base):
@@ -71,8 +96,21 @@ class Message(Base):
     sender_id = Column(String, ForeignKey("users.user_id"), nullable=False)
     receiver_id = Column(String, ForeignKey("users.user_id"), nullable=False)
     message_text = Column(String, nullable=False)
-    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    timestamp = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # Latest message per conversation, from either side of the pair
+        Index("ix_messages_sender_timestamp", sender_id, timestamp.desc()),
+        Index("ix_messages_receiver_timestamp", receiver_id, timestamp.desc()),
+        # Paginated history of a single conversation, in both directions
+        Index("ix_messages_pair_id", sender_id, receiver_id, message_id),
+        Index("ix_messages_pair_id_reverse", receiver_id, sender_id, message_id),
+    )
 
     # Relationships
-    sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_messages")
-    receiver = relationship("User", foreign_keys=[receiver_id], back_populates="received_messages")
+    sender = relationship(
+        "User", foreign_keys=[sender_id], back_populates="sent_messages", lazy="raise"
+    )
+    receiver = relationship(
+        "User", foreign_keys=[receiver_id], back_populates="received_messages", lazy="raise"
+    )
@@ -0,0 +1,22 @@
+"""
+Fast JSON responses for read-heavy endpoints.
+
+Returning a ``Response`` directly makes FastAPI skip ``response_model``
+validation, so endpoints can hand over plain dicts (or bytes that are
+already encoded, e.g. from the Redis cache) without building one
+Pydantic object per row.  The ``response_model`` on the route still
+documents the shape in OpenAPI.
+"""
+
+from typing import Any
+
+import orjson
+from fastapi import Response
+
+
+def json_response(content: Any) -> Response:
+    """Wrap *content* (JSON-compatible data or pre-encoded bytes) in a Response."""
+    if not isinstance(content, bytes):
+        # OPT_UTC_Z writes UTC as "Z", like the Pydantic-serialised routes
+        content = orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return Response(content=content, media_type="application/json")
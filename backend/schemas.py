@@ -5,7 +5,9 @@ Pydantic schemas for Smart Travel Companion Finder.
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, field_validator
+
+from matching import INTEREST_INDEX, _interest_set
 
 
 # ──────────────────────────────
@@ -25,6 +27,22 @@ class UserCreate(BaseModel):
     travel_style: Optional[str] = None
     discoverable: bool = True
 
+    @field_validator("interests")
+    @classmethod
+    def check_interests(cls, value: Optional[str]) -> Optional[str]:
+        """Validate against INTEREST_INDEX and store in canonical form:
+        lower-case, de-duplicated, pipe-joined in vocabulary order."""
+        if value is None:
+            return None
+        interests = _interest_set(value)
+        unknown = interests - INTEREST_INDEX.keys()
+        if unknown:
+            raise ValueError(
+                f"Unknown interests: {', '.join(sorted(unknown))}. "
+                f"Choose from: {', '.join(INTEREST_INDEX)}"
+            )
+        return "|".join(sorted(interests, key=INTEREST_INDEX.__getitem__))
+
 
 class UserLogin(BaseModel):
     email: EmailStr
@@ -108,6 +126,12 @@ class ChatMessageResponse(BaseModel):
         from_attributes = True
 
 
+class ConversationHistoryResponse(BaseModel):
+    """One page of a conversation, oldest message first."""
+    messages: list[ChatMessageResponse]
+    next_cursor: Optional[int] = None
+
+
 class ConversationSummary(BaseModel):
     """Summary of a conversation with another user."""
     user_id: str
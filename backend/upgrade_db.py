@@ -0,0 +1,243 @@
+"""
+One-off upgrade for databases created by earlier versions of the backend.
+
+``create_all`` only creates missing tables, so an existing database has
+to be brought in line with the current models by hand.  Run from the
+``backend`` directory with the app's environment (``DATABASE_URL``
+etc.), before starting the new version:
+
+    python upgrade_db.py
+
+Every step is idempotent, so the script can be re-run safely.
+"""
+
+import asyncio
+
+from sqlalchemy import bindparam, delete, inspect, select, text, update
+
+from database import Base, engine
+from matching import derived_match_fields
+from models import Match, User
+
+# User columns derived from the profile at write time (see
+# matching.derived_match_fields); older databases lack them.
+DERIVED_COLUMNS = (
+    User.destination_norm,
+    User.start_day,
+    User.end_day,
+    User.interests_bits,
+    User.travel_style_norm,
+)
+
+# Which row survives when an unordered pair has several matches
+STATUS_PRIORITY = {"accepted": 0, "pending": 1}
+
+BACKFILL_BATCH_SIZE = 1000
+
+# Indexes created by earlier versions and since dropped from the models
+OBSOLETE_INDEXES = ("ix_matches_pair_status", "uq_matches_accepted_pair")
+
+
+# ──────────────────────────────
+# Columns
+# ──────────────────────────────
+
+def _column_types(sync_conn, table_name: str) -> dict:
+    return {c["name"]: c["type"] for c in inspect(sync_conn).get_columns(table_name)}
+
+
+async def add_derived_columns(conn) -> list[str]:
+    """Add any missing derived columns to ``users``; returns their names.
+
+    They are added without defaults and filled by
+    :func:`backfill_derived_fields`.
+    """
+    existing = await conn.run_sync(_column_types, "users")
+    added = []
+    for column in DERIVED_COLUMNS:
+        if column.name not in existing:
+            column_type = column.type.compile(dialect=conn.dialect)
+            await conn.execute(text(f"ALTER TABLE users ADD COLUMN {column.name} {column_type}"))
+            added.append(column.name)
+    return added
+
+
+async def convert_timestamps_to_timestamptz(conn) -> list[str]:
+    """PostgreSQL only: turn naive ``timestamp`` columns into
+    ``timestamptz``, reading stored values as UTC.
+
+    The models declare ``DateTime(timezone=True)``; asyncpg rejects
+    aware datetimes bound to naive columns.  SQLite stores both alike.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+    converted = []
+    for table in Base.metadata.sorted_tables:
+        existing = await conn.run_sync(_column_types, table.name)
+        for column in table.columns:
+            current = existing.get(column.name)
+            if (
+                getattr(column.type, "timezone", False)
+                and current is not None
+                and not getattr(current, "timezone", True)
+            ):
+                await conn.execute(text(
+                    f"ALTER TABLE {table.name} ALTER COLUMN {column.name} "
+                    f"TYPE timestamptz USING {column.name} AT TIME ZONE 'UTC'"
+                ))
+                converted.append(f"{table.name}.{column.name}")
+    return converted
+
+
+async def backfill_derived_fields(conn) -> int:
+    """Recompute the derived columns of every user from their profile."""
+    users = User.__table__
+    stmt = (
+        users.update()
+        .where(users.c.user_id == bindparam("b_user_id"))
+        .values({column.name: bindparam(column.name) for column in DERIVED_COLUMNS})
+    )
+    result = await conn.execute(
+        select(
+            User.user_id,
+            User.destination,
+            User.start_date,
+            User.end_date,
+            User.interests,
+            User.travel_style,
+        )
+    )
+    count = 0
+    while batch := result.fetchmany(BACKFILL_BATCH_SIZE):
+        await conn.execute(
+            stmt,
+            [{"b_user_id": row.user_id, **derived_match_fields(row)} for row in batch],
+        )
+        count += len(batch)
+    return count
+
+
+# ──────────────────────────────
+# Matches
+# ──────────────────────────────
+
+async def normalize_match_pairs(conn) -> tuple[int, int]:
+    """Store every pair sorted and keep one match per unordered pair.
+
+    ``store_match`` relies on ``uq_matches_pair`` over sorted
+    ``(user1_id, user2_id)``; rows written before pairs were sorted would
+    otherwise sit beside a new sorted duplicate.  Of several matches for
+    the same pair, the accepted one wins, then pending, then the oldest.
+    Pairs are sorted in Python to match ``store_match`` exactly,
+    whatever the database collation.
+
+    Returns:
+        A tuple of ``(deleted, swapped)`` row counts.
+    """
+    rows = (
+        await conn.execute(select(Match.match_id, Match.user1_id, Match.user2_id, Match.status))
+    ).all()
+
+    keep: dict[tuple[str, str], tuple] = {}
+    for row in rows:
+        pair = tuple(sorted((row.user1_id, row.user2_id)))
+        rank = (STATUS_PRIORITY.get(row.status, 2), row.match_id)
+        if pair not in keep or rank < keep[pair][0]:
+            keep[pair] = (rank, row)
+
+    kept_ids = {row.match_id for _, row in keep.values()}
+    duplicate_ids = [row.match_id for row in rows if row.match_id not in kept_ids]
+    if duplicate_ids:
+        await conn.execute(delete(Match).where(Match.match_id.in_(duplicate_ids)))
+
+    swapped = [row for _, row in keep.values() if row.user1_id > row.user2_id]
+    for row in swapped:
+        await conn.execute(
+            update(Match)
+            .where(Match.match_id == row.match_id)
+            .values(user1_id=row.user2_id, user2_id=row.user1_id)
+        )
+
+    return len(duplicate_ids), len(swapped)
+
+
+def _has_unique_pair(sync_conn) -> bool:
+    inspector = inspect(sync_conn)
+    pair = ["user1_id", "user2_id"]
+    return any(
+        uc["column_names"] == pair for uc in inspector.get_unique_constraints("matches")
+    ) or any(
+        ix["unique"] and ix["column_names"] == pair for ix in inspector.get_indexes("matches")
+    )
+
+
+async def ensure_unique_match_pair(conn) -> None:
+    """Create the unique index behind ``store_match``'s ON CONFLICT."""
+    if not await conn.run_sync(_has_unique_pair):
+        await conn.execute(
+            text("CREATE UNIQUE INDEX uq_matches_pair ON matches (user1_id, user2_id)")
+        )
+
+
+# ──────────────────────────────
+# Indexes
+# ──────────────────────────────
+
+def _index_names(sync_conn) -> set[str]:
+    inspector = inspect(sync_conn)
+    return {
+        ix["name"]
+        for table in Base.metadata.sorted_tables
+        for ix in inspector.get_indexes(table.name)
+    }
+
+
+def _create_missing_indexes(sync_conn) -> list[str]:
+    before = _index_names(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            # checkfirst skips existing indexes; ddl_if() skips other dialects
+            index.create(sync_conn, checkfirst=True)
+    return sorted(_index_names(sync_conn) - before)
+
+
+async def create_missing_indexes(conn) -> list[str]:
+    """Create every index declared on the models that does not exist yet."""
+    return await conn.run_sync(_create_missing_indexes)
+
+
+async def drop_obsolete_indexes(conn) -> list[str]:
+    """Drop indexes that ``uq_matches_pair`` has made redundant."""
+    existing = await conn.run_sync(_index_names)
+    dropped = [name for name in OBSOLETE_INDEXES if name in existing]
+    for name in dropped:
+        await conn.execute(text(f"DROP INDEX {name}"))
+    return dropped
+
+
+# ──────────────────────────────
+# Entry point
+# ──────────────────────────────
+
+async def main() -> None:
+    async with engine.begin() as conn:
+        added = await add_derived_columns(conn)
+        print(f"users: added columns {added or 'none'}")
+        converted = await convert_timestamps_to_timestamptz(conn)
+        print(f"timestamps: converted {converted or 'none'}")
+        backfilled = await backfill_derived_fields(conn)
+        print(f"users: backfilled derived fields for {backfilled} user(s)")
+
+        deleted, swapped = await normalize_match_pairs(conn)
+        print(f"matches: removed {deleted} duplicate(s), re-sorted {swapped} pair(s)")
+        await ensure_unique_match_pair(conn)
+
+        created = await create_missing_indexes(conn)
+        print(f"indexes: created {created or 'none'}")
+        dropped = await drop_obsolete_indexes(conn)
+        print(f"indexes: dropped {dropped or 'none'}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())